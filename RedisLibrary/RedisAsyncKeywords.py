@@ -0,0 +1,247 @@
+# -*- coding: utf-8 -*-
+import asyncio
+import time
+from robot.api import logger
+from robot.api.deco import keyword
+import redis
+from redis.cluster import RedisCluster
+from .RedisUtils import percentile
+try:
+    import redis.asyncio as aioredis
+except ImportError:
+    aioredis = None
+__author__ = 'Traitanit Huangsri'
+__email__ = 'traitanit.hua@gmail.com'
+
+
+class RedisAsyncEngine(object):
+    """Run Redis requests of many targets in asyncio event loop with limited number of in-flight requests.
+
+    Clients are created when ``run`` starts and closed when it returns, so keywords stay synchronous.
+    """
+
+    def __init__(self, create_client, concurrency=20):
+        self._create_client = create_client
+        self._concurrency = int(concurrency)
+        self._semaphore = None
+        self.latencies = {}
+
+    def run(self, targets, run_target):
+        """Await ``run_target(target, client)`` for every target concurrently. Return dictionary of result
+        by target. Fail with one error listing every failed target."""
+        results = asyncio.run(self._run(targets, run_target))
+        errors = ["%s: %s" % (target, result) for target, result in results.items()
+                  if isinstance(result, Exception)]
+        if errors:
+            message = "Redis requests failed on %d targets:\n%s" % (len(errors), "\n".join(errors))
+            logger.error(message)
+            raise AssertionError(message)
+        return results
+
+    async def _run(self, targets, run_target):
+        self._semaphore = asyncio.Semaphore(self._concurrency)
+        clients = {}
+        try:
+            for target in targets:
+                clients[target] = self._create_client(target)
+            results = await asyncio.gather(*[run_target(target, clients[target]) for target in targets],
+                                           return_exceptions=True)
+        finally:
+            for client in clients.values():
+                await client.close(close_connection_pool=True)
+        return dict(zip(targets, results))
+
+    async def request(self, target, send):
+        """Await ``send()`` when in-flight slot is free and record its latency for target."""
+        async with self._semaphore:
+            start = time.time()
+            try:
+                return await send()
+            finally:
+                self.latencies.setdefault(target, []).append(time.time() - start)
+
+    def latency_summary(self):
+        """Return number of requests and latency percentiles in milliseconds by target."""
+        summary = {}
+        for target, latencies in self.latencies.items():
+            latencies = sorted(latencies)
+            summary[target] = {
+                'requests': len(latencies),
+                'total_ms': sum(latencies) * 1000,
+                'p50_ms': percentile(latencies, 50) * 1000,
+                'p95_ms': percentile(latencies, 95) * 1000,
+                'max_ms': latencies[-1] * 1000
+            }
+        return summary
+
+
+class RedisAsyncKeywords(object):
+
+    # Connection arguments of registered connection passed to asyncio client
+    ASYNC_CONNECTION_ARGS = ('host', 'port', 'db', 'username', 'password', 'socket_timeout',
+                             'socket_connect_timeout', 'socket_keepalive')
+
+    _fanout_latency = None
+
+    def __init__(self, connections=None):
+        """Connections is registry of connection keywords by alias, so fan-out targets can be aliases."""
+        self._async_connections = connections if connections is not None else {}
+
+    @keyword('Run Command On Redis Servers')
+    def run_command_on_redis_servers(self, targets, *command, concurrency=20):
+        """Send the same Redis command to many servers concurrently and return responses by target.
+
+        Targets are Redis URLs or aliases of connections opened by `Connect To Redis` or
+        `Connect To Redis From URL`. Connections to targets are opened for the keyword call and closed after it.
+        Request latency of each target is logged and returned by `Get Redis Fan-out Latency`.
+
+        Arguments:
+            - targets: List of Redis URLs or connection aliases, or comma separated string of them
+            - command: Redis command and its arguments
+            - concurrency: Maximum number of in-flight requests (default=20)
+
+        Examples:
+        | @{shards}= | Create List | redis://shard-1:6379 | redis://shard-2:6379 |
+        | ${sizes}= | Run Command On Redis Servers | ${shards} | DBSIZE |
+        | ${data}= | Run Command On Redis Servers | ${shards} | GET | BARCODE|1234567890 |
+        """
+        engine = self._get_async_engine(concurrency)
+
+        async def run_target(target, client):
+            return await engine.request(target, lambda: client.execute_command(*command))
+        return self._run_async_engine(engine, targets, run_target)
+
+    @keyword('Get Multiple From Redis Concurrently')
+    def get_multiple_from_redis_concurrently(self, target, *keys, batch_size=100, concurrency=20):
+        """Get data of many keys from one server by ``MGET`` batches sent concurrently
+        on up to concurrency connections.
+
+        Arguments:
+            - target: Redis URL or connection alias
+            - keys: Keys to get
+            - batch_size: Number of keys per ``MGET`` command (default=100)
+            - concurrency: Maximum number of in-flight requests (default=20)
+
+        Return list of data in the same order as keys. Data of missing key is None.
+
+        Examples:
+        | @{data}= | Get Multiple From Redis Concurrently | redis://redis-dev.com:6379 | @{keys} |
+        """
+        engine = self._get_async_engine(concurrency)
+        batch_size = int(batch_size)
+
+        async def run_target(target, client):
+            batches = await asyncio.gather(*[
+                engine.request(target, lambda batch=keys[index:index + batch_size]: client.mget(batch))
+                for index in range(0, len(keys), batch_size)])
+            return [value for batch in batches for value in batch]
+        return self._run_async_engine(engine, [target], run_target)[target] if keys else []
+
+    @keyword('Redis Keys Should Be Exist On Servers')
+    def redis_keys_should_be_exist_on_servers(self, targets, *keys, batch_size=1000, concurrency=20):
+        """Keyword will fail if any key doesn't exist on any of servers. Keys are checked by
+        pipelined ``EXISTS`` batches sent concurrently to all servers, and every missing key is reported.
+
+        Arguments:
+            - targets: List of Redis URLs or connection aliases, or comma separated string of them
+            - keys: Keys to check
+            - batch_size: Number of keys per pipeline (default=1000)
+            - concurrency: Maximum number of in-flight requests (default=20)
+
+        Examples:
+        | Redis Keys Should Be Exist On Servers | ${replicas} | @{keys} | concurrency=50 |
+        """
+        engine = self._get_async_engine(concurrency)
+        batch_size = int(batch_size)
+
+        async def exists_batch(client, batch):
+            pipe = client.pipeline(transaction=False)
+            for key in batch:
+                pipe.exists(key)
+            return await pipe.execute()
+
+        async def run_target(target, client):
+            batches = [keys[index:index + batch_size] for index in range(0, len(keys), batch_size)]
+            results = await asyncio.gather(*[engine.request(target, lambda batch=batch: exists_batch(client, batch))
+                                             for batch in batches])
+            return [key for batch, exists in zip(batches, results) for key, found in zip(batch, exists) if not found]
+        missing = self._run_async_engine(engine, targets, run_target)
+        missing_items = ["%s (%s)" % (key, target) for target, missing_keys in missing.items() for key in missing_keys]
+        if missing_items:
+            message = "Keys: %s don't exist in Redis." % ", ".join(missing_items)
+            logger.error(message)
+            raise AssertionError(message)
+
+    @keyword('Scan Keys On Redis Servers')
+    def scan_keys_on_redis_servers(self, targets, pattern='*', count=0, page_size=1000, concurrency=20):
+        """Get keys that match with pattern from many servers by ``SCAN`` cursors running concurrently.
+
+        Arguments:
+            - targets: List of Redis URLs or connection aliases, or comma separated string of them
+            - pattern: Key pattern may contain wildcard (default=*)
+            - count: Maximum number of keys to return from each server (default=0 is no limit)
+            - page_size: Number of keys Redis should check per ``SCAN`` call (default=1000)
+            - concurrency: Maximum number of in-flight requests (default=20)
+
+        Return dictionary of list of keys by target
+
+        Examples:
+        | ${keys}= | Scan Keys On Redis Servers | ${shards} | BARCODE* |
+        """
+        engine = self._get_async_engine(concurrency)
+        count = int(count)
+
+        async def run_target(target, client):
+            keys = []
+            cursor = None
+            while cursor != 0 and not (count and len(keys) >= count):
+                cursor, page = await engine.request(target, lambda cursor=cursor or 0: client.scan(
+                    cursor, match=pattern, count=int(page_size)))
+                keys.extend(page)
+            return keys[:count] if count else keys
+        return self._run_async_engine(engine, targets, run_target)
+
+    @keyword('Get Redis Fan-out Latency')
+    def get_redis_fanout_latency(self):
+        """Return request latency of each target of the last fan-out keyword as dictionary by target.
+        Each item contains ``requests``, ``total_ms``, ``p50_ms``, ``p95_ms`` and ``max_ms``.
+
+        Examples:
+        | ${sizes}= | Run Command On Redis Servers | ${shards} | DBSIZE |
+        | ${latency}= | Get Redis Fan-out Latency |
+        """
+        return self._fanout_latency or {}
+
+    def _get_async_engine(self, concurrency):
+        if aioredis is None:
+            message = "Fan-out keywords require redis>=4.2 with redis.asyncio. Install it by: pip install -U redis"
+            logger.error(message)
+            raise ImportError(message)
+        return RedisAsyncEngine(self._create_async_client, concurrency)
+
+    def _run_async_engine(self, engine, targets, run_target):
+        if isinstance(targets, str):
+            targets = [target.strip() for target in targets.split(',')]
+        try:
+            return engine.run(list(targets), run_target)
+        finally:
+            self._fanout_latency = engine.latency_summary()
+            for target, latency in sorted(self._fanout_latency.items()):
+                logger.info("%s: %d requests, p50 %.2f ms, p95 %.2f ms, max %.2f ms" % (
+                    target, latency['requests'], latency['p50_ms'], latency['p95_ms'], latency['max_ms']))
+
+    def _create_async_client(self, target):
+        """Create asyncio client of registered connection alias, or of Redis URL."""
+        redis_conn = self._async_connections.get(target)
+        if redis_conn is None:
+            return aioredis.from_url(target)
+        connection_kwargs = getattr(getattr(redis_conn, 'connection_pool', None), 'connection_kwargs', {})
+        if isinstance(redis_conn, RedisCluster) or 'host' not in connection_kwargs:
+            message = "Connection: %s can't be used by fan-out keywords. Use Redis URL of each node." % target
+            logger.error(message)
+            raise AssertionError(message)
+        kwargs = dict((name, connection_kwargs[name]) for name in self.ASYNC_CONNECTION_ARGS
+                      if name in connection_kwargs)
+        if issubclass(redis_conn.connection_pool.connection_class, redis.SSLConnection):
+            kwargs.update(ssl=True, ssl_ca_certs=connection_kwargs.get('ssl_ca_certs'))
+        return aioredis.Redis(**kwargs)
@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+import importlib
+import json
+import zlib
+from robot.api import logger
+__author__ = 'Traitanit Huangsri'
+__email__ = 'traitanit.hua@gmail.com'
+
+
+class RedisCodec(object):
+    """Encode values written to Redis and decode values read from Redis.
+    Codecs which decode values also decode hash field names to string."""
+
+    def __init__(self, name, encode=None, decode=None):
+        self.name = name
+        self._encode = encode
+        self._decode = decode
+
+    def encode(self, value):
+        return value if self._encode is None else self._encode(value)
+
+    def decode(self, value):
+        return value if self._decode is None or value is None else self._decode(value)
+
+    def encode_dict(self, values):
+        if self._encode is None:
+            return values
+        return dict((field, self._encode(value)) for field, value in values.items())
+
+    def decode_list(self, values):
+        if self._decode is None:
+            return values
+        return [self.decode(value) for value in values]
+
+    def decode_field(self, field):
+        if self._decode is None or not isinstance(field, bytes):
+            return field
+        return field.decode('utf-8')
+
+    def decode_dict(self, values):
+        if self._decode is None:
+            return values
+        return dict((self.decode_field(field), self.decode(value)) for field, value in values.items())
+
+
+def _import_optional(module_name, package_name):
+    try:
+        return importlib.import_module(module_name)
+    except ImportError:
+        message = "Codec requires %s. Install it by: pip install %s" % (package_name, package_name)
+        logger.error(message)
+        raise ImportError(message)
+
+
+def _encode_json(value):
+    return json.dumps(value, separators=(',', ':')).encode('utf-8')
+
+
+def _encode_msgpack(value):
+    return _import_optional('msgpack', 'msgpack').packb(value, use_bin_type=True)
+
+
+def _decode_msgpack(value):
+    return _import_optional('msgpack', 'msgpack').unpackb(value, raw=False)
+
+
+def _encode_lz4_json(value):
+    return _import_optional('lz4.frame', 'lz4').compress(_encode_json(value))
+
+
+def _decode_lz4_json(value):
+    return json.loads(_import_optional('lz4.frame', 'lz4').decompress(value))
+
+
+CODECS = dict((codec.name, codec) for codec in [
+    RedisCodec('raw'),
+    RedisCodec('utf-8', lambda value: value.encode('utf-8') if isinstance(value, str) else value,
+               lambda value: value.decode('utf-8')),
+    # json.loads accepts bytes, so values are not copied to str before parsing.
+    RedisCodec('json', _encode_json, json.loads),
+    RedisCodec('msgpack', _encode_msgpack, _decode_msgpack),
+    RedisCodec('zlib-json', lambda value: zlib.compress(_encode_json(value)),
+               lambda value: json.loads(zlib.decompress(value))),
+    RedisCodec('lz4-json', _encode_lz4_json, _decode_lz4_json)
+])
+
+
+def get_codec(name):
+    """Return codec by name. Raise AssertionError if codec doesn't exist."""
+    if isinstance(name, RedisCodec):
+        return name
+    codec = CODECS.get(str(name).lower())
+    if codec is None:
+        message = "Codec: %s doesn't exist. Available codecs are %s." % (name, ", ".join(sorted(CODECS)))
+        logger.error(message)
+        raise AssertionError(message)
+    return codec
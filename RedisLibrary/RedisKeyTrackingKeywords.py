@@ -0,0 +1,131 @@
+# -*- coding: utf-8 -*-
+from robot.api import logger
+from robot.api.deco import keyword
+__author__ = 'Traitanit Huangsri'
+__email__ = 'traitanit.hua@gmail.com'
+
+
+class RedisKeyTrackingKeywords(object):
+
+    TRACKING_SCOPES = ('test', 'suite')
+
+    _key_tracking = None
+    _key_tracking_batch_size = 1000
+    # Stack of open suite and test scopes as dictionaries with ``kind`` and tracked ``connections``
+    _key_tracking_scopes = None
+
+    @keyword('Enable Redis Key Tracking')
+    def enable_redis_key_tracking(self, scope='test', batch_size=1000):
+        """Record every key written by `Set To Redis`, `Append To Redis`, `Set To Redis Hash`,
+        `Add Hash Map To Redis`, `Add Set Data To Redis Set`, `Push Item To First Index In List Redis`,
+        `Push Item To Last Index In List Redis`, `Upload File To Redis Key`, `Add Entries To Redis Stream` and
+        batch keywords e.g. `Set Batch To Redis`, and delete recorded keys by ``UNLINK`` when the scope
+        in which they were written ends.
+
+        Only keys created by these keywords are recorded. Keys which existed before the write (e.g. overwritten
+        or appended fixtures) are checked by ``EXISTS`` before the write and are never deleted, which costs one
+        extra round-trip per write while tracking is enabled. Keys of failed writes are not recorded. Keys written
+        in begun pipeline are recorded only after `Execute Redis Pipeline` succeeds.
+
+        With scope ``test``, keys written in test are deleted at the end of test and keys written in suite
+        setup are deleted at the end of suite. With scope ``suite``, all keys are deleted at the end of suite.
+        Keys are deleted in batches by pipelines, so keyspace is never scanned.
+
+        Arguments:
+            - scope: ``test`` or ``suite`` (default=test)
+            - batch_size: Number of keys deleted by one ``UNLINK`` command (default=1000)
+
+        Examples:
+        | Suite Setup | Enable Redis Key Tracking |
+        | Suite Setup | Enable Redis Key Tracking | scope=suite | batch_size=5000 |
+        """
+        if scope.lower() not in self.TRACKING_SCOPES:
+            message = "Scope: %s is not supported. Use %s." % (scope, " or ".join(self.TRACKING_SCOPES))
+            logger.error(message)
+            raise AssertionError(message)
+        self._key_tracking = scope.lower()
+        self._key_tracking_batch_size = int(batch_size)
+
+    @keyword('Disable Redis Key Tracking')
+    def disable_redis_key_tracking(self):
+        """Stop recording written keys. Keys recorded so far are forgotten and kept in Redis.
+
+        Examples:
+        | Disable Redis Key Tracking |
+        """
+        self._key_tracking = None
+        for scope in self._key_tracking_scopes or []:
+            scope['connections'].clear()
+
+    @keyword('Get Tracked Redis Keys')
+    def get_tracked_redis_keys(self, redis_conn):
+        """Return list of keys of Redis connection recorded since `Enable Redis Key Tracking`
+        and not deleted yet.
+
+        Examples:
+        | @{keys}= | Get Tracked Redis Keys | ${redis_conn} |
+        """
+        keys = {}
+        for scope in self._key_tracking_scopes or []:
+            keys.update(scope['connections'].get(id(redis_conn), (None, {}))[1])
+        return list(keys)
+
+    @keyword('Delete Tracked Redis Keys')
+    def delete_tracked_redis_keys(self):
+        """Delete all recorded keys now instead of at the end of their scopes.
+
+        Return number of deleted keys
+
+        Examples:
+        | ${deleted}= | Delete Tracked Redis Keys |
+        """
+        return sum(self._delete_scope_keys(scope) for scope in self._key_tracking_scopes or [])
+
+    def _get_new_keys(self, redis_conn, *keys):
+        """Return keys which don't exist in Redis yet, so only keys created by library are tracked.
+        Redis is not called while tracking is disabled."""
+        if self._key_tracking is None or not keys:
+            return []
+        exists = self._execute_by_slot(redis_conn, list(dict.fromkeys(keys)), 'exists', per_key=True)
+        return [key for (key,), found in exists.items() if not found]
+
+    def _track_keys(self, redis_conn, *keys):
+        """Record keys written to Redis connection in the innermost scope of tracking."""
+        if self._key_tracking is None or not keys:
+            return
+        if self._key_tracking_scopes is None:
+            self._key_tracking_scopes = []
+        scope = next((scope for scope in reversed(self._key_tracking_scopes)
+                      if self._key_tracking == 'test' or scope['kind'] == 'suite'), None)
+        if scope is None:
+            # Keys written outside of suite are deleted only by `Delete Tracked Redis Keys`.
+            scope = {'kind': 'suite', 'connections': {}}
+            self._key_tracking_scopes.insert(0, scope)
+        tracked = scope['connections'].setdefault(id(redis_conn), (redis_conn, {}))[1]
+        tracked.update(dict.fromkeys(keys))
+
+    def _delete_scope_keys(self, scope):
+        deleted = 0
+        for redis_conn, keys in scope['connections'].values():
+            keys = list(keys)
+            for index in range(0, len(keys), self._key_tracking_batch_size):
+                batch = keys[index:index + self._key_tracking_batch_size]
+                deleted += sum(self._execute_by_slot(redis_conn, batch, 'unlink').values())
+        scope['connections'].clear()
+        return deleted
+
+    def _start_key_tracking_scope(self, kind):
+        if self._key_tracking_scopes is None:
+            self._key_tracking_scopes = []
+        self._key_tracking_scopes.append({'kind': kind, 'connections': {}})
+
+    def _end_key_tracking_scope(self, kind):
+        if not self._key_tracking_scopes or self._key_tracking_scopes[-1]['kind'] != kind:
+            return
+        scope = self._key_tracking_scopes.pop()
+        if not scope['connections']:
+            return
+        try:
+            logger.info("Deleted %d tracked Redis keys at the end of %s." % (self._delete_scope_keys(scope), kind))
+        except Exception as ex:
+            logger.warn("Tracked Redis keys are not deleted: %s" % ex)
@@ -0,0 +1,184 @@
+# -*- coding: utf-8 -*-
+import time
+from robot.api import logger
+from robot.api.deco import keyword
+__author__ = 'Traitanit Huangsri'
+__email__ = 'traitanit.hua@gmail.com'
+
+
+class RedisLatencyCapture(object):
+    """Snapshot server statistics of Redis connection and report what Redis did until ``stop``.
+
+    Each snapshot is one pipeline of ``INFO stats``, ``INFO commandstats``, ``SLOWLOG GET``, ``LATENCY LATEST``
+    and ``TIME``. Commands which server doesn't support or allow are left out of report.
+    """
+
+    STATS = ('total_commands_processed', 'keyspace_hits', 'keyspace_misses', 'evicted_keys', 'expired_keys',
+             'total_net_input_bytes', 'total_net_output_bytes', 'rejected_connections')
+    # Commands sent by snapshot are not reported as commands of test.
+    CAPTURE_COMMANDS = ('info', 'slowlog', 'latency', 'time')
+
+    def __init__(self, redis_conn, slowlog_size=128):
+        self._redis_conn = redis_conn
+        self._slowlog_size = int(slowlog_size)
+        self._start = self._snapshot()
+
+    def _snapshot(self):
+        pipe = self._redis_conn.pipeline(transaction=False)
+        pipe.info('stats')
+        pipe.info('commandstats')
+        pipe.slowlog_get(self._slowlog_size)
+        pipe.execute_command('LATENCY', 'LATEST')
+        pipe.time()
+        # Commands of start snapshot are processed after its INFO stats and counted by end snapshot.
+        commands = len(pipe.command_stack)
+        results = [None if isinstance(result, Exception) else result
+                   for result in pipe.execute(raise_on_error=False)]
+        stats, commandstats, slowlog, latency, server_time = results
+        return {'stats': stats, 'commandstats': commandstats, 'slowlog': slowlog, 'latency': latency,
+                'server_time': server_time[0] if server_time else None, 'time': time.time(), 'commands': commands}
+
+    def stop(self):
+        """Return dictionary of ``seconds``, ``stats`` and ``commands`` deltas, and new ``slowlog`` entries
+        and ``latency`` events since the capture was started."""
+        end = self._snapshot()
+        report = {'seconds': end['time'] - self._start['time'], 'stats': {}, 'commands': {}, 'slowlog': [],
+                  'latency': []}
+        if self._start['stats'] and end['stats']:
+            report['stats'] = dict((name, end['stats'][name] - self._start['stats'].get(name, 0))
+                                   for name in self.STATS if name in end['stats'])
+            if 'total_commands_processed' in report['stats']:
+                report['stats']['total_commands_processed'] -= self._start['commands']
+        if self._start['commandstats'] is not None and end['commandstats']:
+            report['commands'] = self._get_command_deltas(self._start['commandstats'], end['commandstats'])
+        if end['slowlog']:
+            last_id = max([entry['id'] for entry in self._start['slowlog'] or []] or [-1])
+            report['slowlog'] = [self._decode_slowlog_entry(entry) for entry in end['slowlog']
+                                 if entry['id'] > last_id]
+        if end['latency']:
+            report['latency'] = [{'event': self._decode(event), 'time': timestamp, 'latest_ms': latest,
+                                  'max_ms': maximum} for event, timestamp, latest, maximum, *_ in end['latency']
+                                 if self._start['server_time'] is None or timestamp >= self._start['server_time']]
+        return report
+
+    def _get_command_deltas(self, start, end):
+        commands = {}
+        for name, stats in end.items():
+            command = name[len('cmdstat_'):] if name.startswith('cmdstat_') else name
+            if command.split('|')[0] in self.CAPTURE_COMMANDS:
+                continue
+            calls = stats.get('calls', 0) - start.get(name, {}).get('calls', 0)
+            if calls <= 0:
+                continue
+            usec = stats.get('usec', 0) - start.get(name, {}).get('usec', 0)
+            commands[command] = {'calls': calls, 'usec': usec, 'usec_per_call': float(usec) / calls}
+        return commands
+
+    def _decode_slowlog_entry(self, entry):
+        return {'id': entry['id'], 'start_time': entry['start_time'], 'duration_usec': entry['duration'],
+                'command': self._decode(entry['command'])}
+
+    @staticmethod
+    def _decode(value):
+        return value.decode('utf-8', 'replace') if isinstance(value, bytes) else value
+
+    @staticmethod
+    def format_report(report):
+        lines = ['Redis server activity in %.3f seconds' % report['seconds']]
+        if report['stats']:
+            lines.append('Stats: ' + ', '.join('%s=%s' % item for item in sorted(report['stats'].items())))
+        lines.append('%-30s %10s %12s %14s' % ('Command', 'Calls', 'usec', 'usec/call'))
+        for command, stats in sorted(report['commands'].items(), key=lambda item: -item[1]['usec']):
+            lines.append('%-30s %10d %12d %14.2f' % (command, stats['calls'], stats['usec'], stats['usec_per_call']))
+        for entry in report['slowlog']:
+            lines.append('Slowlog: %d usec %s' % (entry['duration_usec'], entry['command']))
+        for event in report['latency']:
+            lines.append('Latency: %s latest %d ms, max %d ms' % (event['event'], event['latest_ms'],
+                                                                  event['max_ms']))
+        return '\n'.join(lines)
+
+
+class RedisLatencyKeywords(object):
+
+    _latency_captures = None
+    _latency_capture_connections = None
+    _test_latency_captures = None
+
+    @keyword('Start Redis Latency Capture')
+    def start_redis_latency_capture(self, redis_conn, slowlog_size=128):
+        """Snapshot ``SLOWLOG``, ``LATENCY LATEST``, ``INFO commandstats`` and ``INFO stats`` of Redis server,
+        so `Stop Redis Latency Capture` can report what the server did in between.
+
+        Arguments:
+            - redis_conn: Redis connection object
+            - slowlog_size: Number of the newest slowlog entries to read (default=128)
+
+        Examples:
+        | Start Redis Latency Capture | ${redis_conn} |
+        | Call Service Under Test |
+        | ${report}= | Stop Redis Latency Capture | ${redis_conn} |
+        """
+        if self._latency_captures is None:
+            self._latency_captures = {}
+        self._latency_captures[id(redis_conn)] = RedisLatencyCapture(redis_conn, slowlog_size)
+
+    @keyword('Stop Redis Latency Capture')
+    def stop_redis_latency_capture(self, redis_conn):
+        """Log and return server activity since `Start Redis Latency Capture`.
+
+        Report is dictionary with ``seconds``, ``stats`` (deltas of total_commands_processed, keyspace_hits,
+        keyspace_misses, evicted_keys, expired_keys, ...), ``commands`` (``calls``, ``usec`` and
+        ``usec_per_call`` of each command), new ``slowlog`` entries and ``latency`` events.
+        ``INFO``, ``SLOWLOG``, ``LATENCY`` and ``TIME`` commands are not reported.
+
+        Examples:
+        | ${report}= | Stop Redis Latency Capture | ${redis_conn} |
+        | Should Be True | ${report}[stats][evicted_keys] == 0 |
+        """
+        capture = (self._latency_captures or {}).pop(id(redis_conn), None)
+        if capture is None:
+            logger.error("Latency capture is not started on this Redis connection.")
+            raise AssertionError
+        report = capture.stop()
+        logger.info(RedisLatencyCapture.format_report(report))
+        return report
+
+    @keyword('Enable Redis Latency Capture')
+    def enable_redis_latency_capture(self, redis_conn):
+        """Capture server activity of Redis connection around every test and log it at the end of test,
+        as if test started with `Start Redis Latency Capture` and ended with `Stop Redis Latency Capture`.
+
+        Examples:
+        | Suite Setup | Enable Redis Latency Capture | ${redis_conn} |
+        """
+        if self._latency_capture_connections is None:
+            self._latency_capture_connections = []
+        if redis_conn not in self._latency_capture_connections:
+            self._latency_capture_connections.append(redis_conn)
+
+    @keyword('Disable Redis Latency Capture')
+    def disable_redis_latency_capture(self):
+        """Stop capturing server activity around tests.
+
+        Examples:
+        | Disable Redis Latency Capture |
+        """
+        self._latency_capture_connections = None
+
+    def _start_test(self, name, attrs):
+        """Start latency capture of enabled connections. Called by Robot Framework as library listener."""
+        self._test_latency_captures = []
+        for redis_conn in self._latency_capture_connections or []:
+            try:
+                self._test_latency_captures.append(RedisLatencyCapture(redis_conn))
+            except Exception as ex:
+                logger.warn("Redis latency capture is not started: %s" % ex)
+
+    def _end_test(self, name, attrs):
+        """Log latency capture of enabled connections. Called by Robot Framework as library listener."""
+        for capture in self._test_latency_captures or []:
+            try:
+                logger.info(RedisLatencyCapture.format_report(capture.stop()))
+            except Exception as ex:
+                logger.warn("Redis latency capture is not stopped: %s" % ex)
+        self._test_latency_captures = None
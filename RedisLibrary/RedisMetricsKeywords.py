@@ -0,0 +1,282 @@
+# -*- coding: utf-8 -*-
+import contextvars
+import functools
+import json
+import threading
+import time
+from robot.api import logger
+from robot.api.deco import keyword
+import redis
+from redis.cluster import RedisCluster, ClusterPipeline
+from .RedisUtils import percentile
+__author__ = 'Traitanit Huangsri'
+__email__ = 'traitanit.hua@gmail.com'
+
+
+# Counters of keyword measured in current context. Threads started by ``threading`` run in empty context,
+# so commands of subscriber, read cache and other background threads are not charged to the keyword.
+_current_call = contextvars.ContextVar('redis_metrics_call', default=None)
+
+
+class _RedisPatches(object):
+    """Wrap redis-py methods once for the whole process. Every ``RedisMetrics`` installs them, and they are
+    restored when the last one uninstalls, in any order."""
+
+    PATCHES = [
+        (redis.Redis, 'execute_command', 'command'),
+        (redis.client.Pipeline, 'execute', 'pipeline'),
+        (RedisCluster, 'execute_command', 'command'),
+        (ClusterPipeline, 'execute', 'pipeline'),
+        (redis.connection.Connection, 'send_packed_command', 'send')
+    ]
+
+    def __init__(self):
+        self._users = 0
+        self._originals = []
+        self._lock = threading.Lock()
+
+    def install(self):
+        with self._lock:
+            self._users += 1
+            if self._users > 1:
+                return
+            for cls, name, kind in self.PATCHES:
+                self._originals.append((cls, name, cls.__dict__.get(name)))
+                setattr(cls, name, getattr(self, '_wrap_' + kind)(getattr(cls, name)))
+
+    def uninstall(self):
+        with self._lock:
+            self._users -= 1
+            if self._users > 0:
+                return
+            for cls, name, original in reversed(self._originals):
+                if original is None:
+                    delattr(cls, name)
+                else:
+                    setattr(cls, name, original)
+            self._originals = []
+
+    @staticmethod
+    def _wrap_command(execute_command):
+        @functools.wraps(execute_command)
+        def wrapper(client, *args, **options):
+            response = execute_command(client, *args, **options)
+            call = _current_call.get()
+            if call is not None:
+                call.add(commands=1, response_bytes=RedisMetrics._payload_size(response))
+            return response
+        return wrapper
+
+    @staticmethod
+    def _wrap_pipeline(execute):
+        @functools.wraps(execute)
+        def wrapper(pipe, *args, **kwargs):
+            commands = len(pipe.command_stack)
+            response = execute(pipe, *args, **kwargs)
+            call = _current_call.get()
+            if call is not None:
+                call.add(commands=commands, response_bytes=RedisMetrics._payload_size(response))
+            return response
+        return wrapper
+
+    @staticmethod
+    def _wrap_send(send_packed_command):
+        @functools.wraps(send_packed_command)
+        def wrapper(connection, command, *args, **kwargs):
+            call = _current_call.get()
+            if call is not None:
+                call.add(round_trips=1, bytes_sent=RedisMetrics._payload_size(command))
+            return send_packed_command(connection, command, *args, **kwargs)
+        return wrapper
+
+
+_patches = _RedisPatches()
+
+
+class _KeywordCall(object):
+    """Counters of one measured keyword call. Workers of the keyword may add to it concurrently."""
+
+    COUNTERS = ('commands', 'round_trips', 'bytes_sent', 'response_bytes')
+
+    def __init__(self):
+        self.counters = dict.fromkeys(self.COUNTERS, 0)
+        self._lock = threading.Lock()
+
+    def add(self, **counters):
+        with self._lock:
+            for name, value in counters.items():
+                self.counters[name] += value
+
+
+class RedisMetrics(object):
+    """Collect Redis command count, round-trips, bytes and latency of each keyword.
+
+    Commands are counted by wrapping ``execute_command`` and pipeline ``execute`` of redis-py clients,
+    round-trips and bytes sent by wrapping ``Connection.send_packed_command``. Only commands sent from
+    the context of the keyword are counted, including its concurrent workers on Redis cluster.
+    Response bytes is the size of decoded response payload returned to the keyword, not bytes read from socket.
+    """
+
+    def __init__(self):
+        self.keywords = {}
+        self._installed = False
+
+    def install(self):
+        """Wrap redis-py methods. Call ``uninstall`` to restore them."""
+        if not self._installed:
+            _patches.install()
+            self._installed = True
+
+    def uninstall(self):
+        if self._installed:
+            _patches.uninstall()
+            self._installed = False
+
+    @staticmethod
+    def _payload_size(payload):
+        if isinstance(payload, (bytes, bytearray, memoryview, str)):
+            return len(payload)
+        if isinstance(payload, dict):
+            return sum(RedisMetrics._payload_size(k) + RedisMetrics._payload_size(v) for k, v in payload.items())
+        if isinstance(payload, (list, tuple, set)):
+            return sum(RedisMetrics._payload_size(item) for item in payload)
+        if payload is None:
+            return 0
+        return len(str(payload))
+
+    def measure(self, keyword_name, run_keyword):
+        """Run keyword and record its metrics. Keywords called by another keyword are counted in the outer one."""
+        if _current_call.get() is not None:
+            return run_keyword()
+        call = _KeywordCall()
+        token = _current_call.set(call)
+        start = time.time()
+        try:
+            return run_keyword()
+        finally:
+            _current_call.reset(token)
+            self._record(keyword_name, call.counters, time.time() - start)
+
+    def _record(self, keyword_name, counters, latency):
+        stats = self.keywords.get(keyword_name)
+        if stats is None:
+            stats = self.keywords[keyword_name] = dict(calls=0, latencies=[], **dict.fromkeys(counters, 0))
+        stats['calls'] += 1
+        for name, value in counters.items():
+            stats[name] += value
+        stats['latencies'].append(latency)
+
+    def summary(self):
+        """Return metrics of each keyword with latency percentiles in milliseconds."""
+        summary = {}
+        for keyword_name, stats in self.keywords.items():
+            latencies = sorted(stats['latencies'])
+            summary[keyword_name] = dict((name, value) for name, value in stats.items() if name != 'latencies')
+            summary[keyword_name].update({
+                'total_ms': sum(latencies) * 1000,
+                'p50_ms': percentile(latencies, 50) * 1000,
+                'p95_ms': percentile(latencies, 95) * 1000,
+                'p99_ms': percentile(latencies, 99) * 1000,
+                'max_ms': latencies[-1] * 1000
+            })
+        return summary
+
+    def format_summary(self):
+        lines = ['%-45s %8s %9s %9s %12s %12s %10s %10s %10s' % (
+            'Keyword', 'Calls', 'Commands', 'RTT', 'Sent', 'Response', 'p50 ms', 'p95 ms', 'p99 ms')]
+        for keyword_name, stats in sorted(self.summary().items(), key=lambda item: -item[1]['total_ms']):
+            lines.append('%-45s %8d %9d %9d %12d %12d %10.2f %10.2f %10.2f' % (
+                keyword_name, stats['calls'], stats['commands'], stats['round_trips'], stats['bytes_sent'],
+                stats['response_bytes'], stats['p50_ms'], stats['p95_ms'], stats['p99_ms']))
+        return '\n'.join(lines)
+
+    def write_json(self, path):
+        with open(path, 'w') as metrics_file:
+            json.dump(self.summary(), metrics_file, indent=2, sort_keys=True)
+
+
+def instrument_keywords(cls):
+    """Class decorator wrapping every keyword of library so it is measured while Redis metrics is enabled."""
+    for name in dir(cls):
+        method = getattr(cls, name, None)
+        robot_name = getattr(method, 'robot_name', None)
+        if robot_name is None or not callable(method):
+            continue
+        setattr(cls, name, _instrument_keyword(method, robot_name))
+    return cls
+
+
+def _instrument_keyword(method, robot_name):
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        if self._metrics is None:
+            return method(self, *args, **kwargs)
+        return self._metrics.measure(robot_name, lambda: method(self, *args, **kwargs))
+    return wrapper
+
+
+class RedisMetricsKeywords(object):
+
+    ROBOT_LISTENER_API_VERSION = 2
+
+    _metrics = None
+    _metrics_file = None
+
+    @keyword('Enable Redis Metrics')
+    def enable_redis_metrics(self, metrics_file=None):
+        """Start recording Redis command count, round-trips, bytes sent, response bytes and latency of every keyword.
+
+        Metrics summary is logged by `Log Redis Metrics` and at the end of the top level suite.
+
+        Arguments:
+            - metrics_file: Path of JSON file which metrics summary is written to at the end of the top level suite
+
+        Examples:
+        | Enable Redis Metrics | metrics_file=${OUTPUT_DIR}/redis_metrics.json |
+        """
+        if self._metrics is None:
+            self._metrics = RedisMetrics()
+            self._metrics.install()
+        self._metrics_file = metrics_file
+
+    @keyword('Disable Redis Metrics')
+    def disable_redis_metrics(self):
+        """Stop recording Redis metrics and discard recorded metrics.
+
+        Examples:
+        | Disable Redis Metrics |
+        """
+        if self._metrics is not None:
+            self._metrics.uninstall()
+        self._metrics = None
+
+    @keyword('Get Redis Metrics')
+    def get_redis_metrics(self):
+        """Return recorded metrics as dictionary by keyword name. Each item contains ``calls``, ``commands``,
+        ``round_trips``, ``bytes_sent``, ``response_bytes`` (size of decoded response), ``total_ms``, ``p50_ms``, ``p95_ms``, ``p99_ms``
+        and ``max_ms``.
+
+        Examples:
+        | ${metrics}= | Get Redis Metrics |
+        """
+        return self._metrics.summary() if self._metrics is not None else {}
+
+    @keyword('Log Redis Metrics')
+    def log_redis_metrics(self, metrics_file=None):
+        """Log recorded metrics summary and write it to JSON file if metrics_file is given.
+
+        Examples:
+        | Log Redis Metrics | ${OUTPUT_DIR}/redis_metrics.json |
+        """
+        if self._metrics is None:
+            logger.warn("Redis metrics is not enabled.")
+            return
+        logger.info(self._metrics.format_summary())
+        if metrics_file:
+            self._metrics.write_json(metrics_file)
+            logger.info("Redis metrics is written to %s" % metrics_file)
+
+    def _end_suite(self, name, attrs):
+        """Log metrics summary at the end of top level suite. Called by Robot Framework as library listener."""
+        if self._metrics is not None and attrs.get('id') == 's1':
+            self.log_redis_metrics(self._metrics_file)
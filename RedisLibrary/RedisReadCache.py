@@ -0,0 +1,247 @@
+# -*- coding: utf-8 -*-
+import collections
+import threading
+import time
+from robot.api import logger
+import redis
+from .RedisUtils import get_keyspace_channel, get_keyspace_event_classes
+__author__ = 'Traitanit Huangsri'
+__email__ = 'traitanit.hua@gmail.com'
+
+
+class RedisReadCache(object):
+    """Client-side LRU cache of values read from Redis connection with optional TTL.
+
+    Cached values are invalidated by background thread listening to one of:
+        - ``tracking``: ``CLIENT TRACKING ON REDIRECT <id> BCAST`` invalidation messages (Redis 6.0 or later)
+        - ``keyspace``: keyspace notifications ``__keyspace@<db>__:*``, which must be enabled on server
+        - ``none``: no server invalidation, only TTL and writes made by library keywords
+
+    When invalidation connection reconnects, messages sent meanwhile are lost, so whole cache is cleared.
+    Tracking is also turned on again, because redirect points to client ID of the old connection.
+    Tracking connection is pinged every ``HEALTH_CHECK_INTERVAL`` seconds, so it isn't closed by idle timeout
+    and its loss is detected.
+    """
+
+    TRACKING_CHANNEL = '__redis__:invalidate'
+    # Keyspace event classes which report every change of cached strings and hashes:
+    # generic (DEL, RENAME...), string, hash, expired and evicted
+    KEYSPACE_EVENT_CLASSES = 'g$hxe'
+    HEALTH_CHECK_INTERVAL = 5.0
+
+    def __init__(self, redis_conn, max_size=10000, ttl=None, invalidation='auto', prefixes=None):
+        self.max_size = int(max_size)
+        self.ttl = float(ttl) if ttl else None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self._redis_conn = redis_conn
+        self._entries = collections.OrderedDict()
+        self._entries_by_key = {}
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._pubsub = None
+        self._keyspace_prefix = None
+        self._tracking_connection = None
+        self._prefixes = prefixes or []
+        self._reconnected = threading.Event()
+        self._errors = []
+        self._thread = None
+        self.invalidation = self._start_invalidation(invalidation.lower(), prefixes or [])
+        if self._pubsub is not None:
+            self._start_listener()
+
+    def _start_invalidation(self, invalidation, prefixes):
+        if invalidation in ('auto', 'tracking'):
+            try:
+                self._start_tracking(prefixes)
+                return 'tracking'
+            except redis.ResponseError as ex:
+                self._close_tracking()
+                self._close_pubsub()
+                if invalidation == 'tracking':
+                    raise
+                logger.info("Client tracking is not available: %s" % ex)
+        if invalidation == 'keyspace' or (invalidation == 'auto' and self._is_keyspace_notification_enabled()):
+            self._keyspace_prefix = get_keyspace_channel(self._redis_conn, '')
+            self._pubsub = self._redis_conn.pubsub(ignore_subscribe_messages=True)
+            self._pubsub.psubscribe(*[self._keyspace_prefix + prefix + '*' for prefix in prefixes or ['']])
+            self._pubsub.connection.register_connect_callback(self._on_reconnect)
+            return 'keyspace'
+        if invalidation == 'auto':
+            logger.warn("Redis read cache is invalidated only by TTL and writes of library keywords.")
+        return 'none'
+
+    def _start_tracking(self, prefixes):
+        """Subscribe invalidation channel on dedicated connection and redirect broadcast tracking to it."""
+        self._pubsub = self._redis_conn.pubsub(ignore_subscribe_messages=True)
+        self._pubsub.execute_command('CLIENT', 'ID')
+        client_id = self._pubsub.parse_response()
+        self._pubsub.subscribe(self.TRACKING_CHANNEL)
+        # Connection is already connected, so callback is called only when it reconnects.
+        self._pubsub.connection.register_connect_callback(self._on_reconnect)
+        connection = self._redis_conn.connection_pool.get_connection('CLIENT')
+        try:
+            args = ['CLIENT', 'TRACKING', 'ON', 'REDIRECT', client_id, 'BCAST']
+            for prefix in prefixes:
+                args += ['PREFIX', prefix]
+            connection.send_command(*args)
+            connection.read_response()
+        except Exception:
+            self._redis_conn.connection_pool.release(connection)
+            raise
+        self._tracking_connection = connection
+
+    def _restart_tracking(self):
+        """Turn tracking on again with redirect to new invalidation connection."""
+        self.invalidate()
+        self._close_tracking()
+        self._close_pubsub()
+        self._start_tracking(self._prefixes)
+        # Values read while tracking was off may be stale.
+        self.invalidate()
+
+    def _check_tracking(self):
+        """Ping tracking connection. Restart tracking when it or invalidation connection was lost."""
+        if not self._reconnected.is_set():
+            try:
+                self._tracking_connection.send_command('PING')
+                self._tracking_connection.read_response()
+                return
+            except (redis.ConnectionError, redis.TimeoutError):
+                pass
+        self._reconnected.clear()
+        self._restart_tracking()
+
+    def _on_reconnect(self, connection):
+        self._reconnected.set()
+
+    def _is_keyspace_notification_enabled(self):
+        return set(self.KEYSPACE_EVENT_CLASSES) <= get_keyspace_event_classes(self._redis_conn)
+
+    def _start_listener(self):
+        self._thread = threading.Thread(target=self._listen, name='RedisReadCache')
+        self._thread.daemon = True
+        self._thread.start()
+
+    def _listen(self):
+        next_check = time.time() + self.HEALTH_CHECK_INTERVAL
+        while not self._stopped.is_set():
+            try:
+                if self.invalidation == 'tracking' and (self._reconnected.is_set() or time.time() >= next_check):
+                    self._check_tracking()
+                    next_check = time.time() + self.HEALTH_CHECK_INTERVAL
+                elif self._reconnected.is_set():
+                    self._reconnected.clear()
+                    self.invalidate()
+                message = self._pubsub.get_message(timeout=0.1)
+            except Exception as ex:
+                if not self._stopped.is_set():
+                    # Invalidation messages may be lost, so cached values can't be trusted anymore.
+                    # Robot Framework logger can't be used in this thread, so error is reported by ``pop_errors``.
+                    self._errors.append("Redis read cache invalidation stopped, cache is disabled: %s" % ex)
+                    self.invalidation = 'none'
+                    self.max_size = 0
+                    self.invalidate()
+                return
+            if message is not None:
+                self.handle_message(message)
+
+    def pop_errors(self):
+        """Return and forget errors of invalidation thread."""
+        errors, self._errors = self._errors, []
+        return errors
+
+    def handle_message(self, message):
+        """Invalidate keys of tracking or keyspace notification message."""
+        channel = message['channel'].decode() if isinstance(message['channel'], bytes) else message['channel']
+        if channel == self.TRACKING_CHANNEL:
+            data = message['data']
+            # Invalidation without keys is sent when database is flushed.
+            if data is None or not isinstance(data, (list, tuple)):
+                self.invalidate()
+            else:
+                self.invalidate(*data)
+        elif self._keyspace_prefix and channel.startswith(self._keyspace_prefix):
+            self.invalidate(channel[len(self._keyspace_prefix):])
+
+    def get(self, cache_key, redis_key, read):
+        """Return cached value of cache_key, or read it by ``read()`` and cache it.
+        Value is cached under redis_key, so writes to redis_key invalidate it."""
+        with self._lock:
+            entry = self._entries.get(cache_key)
+            if entry is not None and (entry[1] is None or entry[1] > time.time()):
+                self._entries.move_to_end(cache_key)
+                self.hits += 1
+                return self._copy(entry[0])
+            self.misses += 1
+            invalidations = self.invalidations
+        value = read()
+        with self._lock:
+            # Value read while key was invalidated may be stale, so it is not cached.
+            if invalidations == self.invalidations and self.max_size > 0:
+                redis_key = self._encode_key(redis_key)
+                self._entries[cache_key] = (value, time.time() + self.ttl if self.ttl else None, redis_key)
+                self._entries.move_to_end(cache_key)
+                self._entries_by_key.setdefault(redis_key, set()).add(cache_key)
+                while len(self._entries) > self.max_size:
+                    self._remove(next(iter(self._entries)))
+                    self.evictions += 1
+        return self._copy(value)
+
+    def invalidate(self, *keys):
+        """Remove cached values of keys, or all cached values when no key is given."""
+        with self._lock:
+            self.invalidations += 1
+            if not keys:
+                self._entries.clear()
+                self._entries_by_key.clear()
+                return
+            for key in keys:
+                for cache_key in self._entries_by_key.pop(self._encode_key(key), ()):
+                    self._entries.pop(cache_key, None)
+
+    def _remove(self, cache_key):
+        redis_key = self._entries.pop(cache_key)[2]
+        cache_keys = self._entries_by_key[redis_key]
+        cache_keys.discard(cache_key)
+        if not cache_keys:
+            del self._entries_by_key[redis_key]
+
+    def stats(self):
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions,
+                    'invalidations': self.invalidations, 'size': len(self._entries), 'invalidation': self.invalidation}
+
+    def close(self):
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+        self._close_tracking()
+        self._close_pubsub()
+
+    def _close_tracking(self):
+        if self._tracking_connection is not None:
+            connection, self._tracking_connection = self._tracking_connection, None
+            try:
+                connection.send_command('CLIENT', 'TRACKING', 'OFF')
+                connection.read_response()
+            except (redis.ConnectionError, redis.TimeoutError):
+                connection.disconnect()
+            finally:
+                self._redis_conn.connection_pool.release(connection)
+
+    def _close_pubsub(self):
+        if self._pubsub is not None:
+            self._pubsub.close()
+            self._pubsub = None
+
+    @staticmethod
+    def _encode_key(key):
+        return key if isinstance(key, bytes) else str(key).encode('utf-8')
+
+    @staticmethod
+    def _copy(value):
+        """Return copy of mutable value, so caller can't change cached value."""
+        return dict(value) if isinstance(value, dict) else value
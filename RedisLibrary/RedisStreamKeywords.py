@@ -0,0 +1,212 @@
+# -*- coding: utf-8 -*-
+import itertools
+from robot.api import logger
+from robot.api.deco import keyword
+from robot.utils import timestr_to_secs
+import redis
+__author__ = 'Traitanit Huangsri'
+__email__ = 'traitanit.hua@gmail.com'
+
+
+class RedisStreamKeywords(object):
+
+    @keyword('Add Entries To Redis Stream')
+    def add_entries_to_redis_stream(self, redis_conn, stream_name, entries, maxlen=None, chunk_size=1000):
+        """ Add entries to Redis stream by ``XADD`` using pipeline, one round-trip per chunk.
+
+        Arguments:
+            - redis_conn: Redis connection object
+            - stream_name: Stream name
+            - entries: List of dictionaries of fields, one dictionary, or path of NDJSON file with one entry per line
+            - maxlen: Trim stream to about this number of entries by ``MAXLEN ~`` (default is no trimming)
+            - chunk_size: Number of entries sent per round-trip (default=1000)
+
+        Return list of entry IDs
+
+        Examples:
+        | &{event}= | Create Dictionary | type=order-created | order_id=1234 |
+        | @{ids}= | Add Entries To Redis Stream | ${redis_conn} | Events | ${event} |
+        | @{ids}= | Add Entries To Redis Stream | ${redis_conn} | Events | ${CURDIR}/events.ndjson | maxlen=100000 |
+        """
+        if isinstance(entries, dict):
+            entries = [entries]
+        elif isinstance(entries, str):
+            entries = self._read_batch_file(entries)
+        entries = iter(entries)
+        maxlen = int(maxlen) if maxlen else None
+        entry_ids = []
+        new_keys = self._get_new_keys(redis_conn, stream_name)
+        while True:
+            chunk = list(itertools.islice(entries, int(chunk_size)))
+            if not chunk:
+                break
+            pipe = redis_conn.pipeline(transaction=False)
+            for fields in chunk:
+                pipe.xadd(stream_name, fields, maxlen=maxlen, approximate=True)
+            entry_ids.extend(pipe.execute())
+            self._track_keys(redis_conn, *new_keys)
+        return entry_ids
+
+    @keyword('Get Entries From Redis Stream')
+    def get_entries_from_redis_stream(self, redis_conn, stream_name, min_id='-', max_id='+', count=0, page_size=1000,
+                                      reverse=False):
+        """ Get entries from Redis stream page by page by ``XRANGE`` (``XREVRANGE`` when reverse is True),
+            so long stream doesn't block Redis.
+
+        Arguments:
+            - redis_conn: Redis connection object
+            - stream_name: Stream name
+            - min_id: Smallest entry ID to return (default=- is the first entry)
+            - max_id: Biggest entry ID to return (default=+ is the last entry)
+            - count: Maximum number of entries to return (default=0 is no limit)
+            - page_size: Number of entries per ``XRANGE`` call (default=1000)
+            - reverse: Return entries from the last one (default is False)
+
+        Return list of (entry ID, dictionary of fields)
+
+        Examples:
+        | @{entries}= | Get Entries From Redis Stream | ${redis_conn} | Events | count=10 | reverse=True |
+        """
+        count = int(count)
+        # Page bigger than count would read entries which are not returned.
+        page_size = min(int(page_size), count) if count else int(page_size)
+        redis_conn = self._get_redis_reader(redis_conn)
+        return list(self._read_scan(self._iter_stream_range(redis_conn, stream_name, min_id, max_id,
+                                                            page_size, reverse), count))
+
+    @staticmethod
+    def _iter_stream_range(redis_conn, stream_name, min_id, max_id, page_size, reverse=False):
+        """Yield entries of stream range, one ``XRANGE``/``XREVRANGE`` call per page."""
+        while True:
+            if reverse:
+                page = redis_conn.xrevrange(stream_name, max_id, min_id, count=page_size)
+            else:
+                page = redis_conn.xrange(stream_name, min_id, max_id, count=page_size)
+            for entry in page:
+                yield entry
+            if len(page) < page_size:
+                return
+            # Exclusive range "(" needs Redis 6.2, so continue from the ID next to the last one.
+            last_id = page[-1][0]
+            if isinstance(last_id, bytes):
+                last_id = last_id.decode()
+            milliseconds, sequence = [int(part) for part in last_id.split('-')]
+            if not reverse:
+                min_id = '%d-%d' % (milliseconds, sequence + 1)
+            elif sequence:
+                max_id = '%d-%d' % (milliseconds, sequence - 1)
+            elif milliseconds:
+                max_id = '%d-%d' % (milliseconds - 1, 2 ** 64 - 1)
+            else:
+                return
+
+    @keyword('Get Length Of Redis Stream')
+    def get_length_of_redis_stream(self, redis_conn, stream_name):
+        """ Get number of entries in Redis stream.
+
+        Examples:
+        | ${length}= | Get Length Of Redis Stream | ${redis_conn} | Events |
+        """
+        return self._get_redis_reader(redis_conn).xlen(stream_name)
+
+    @keyword('Create Redis Consumer Group')
+    def create_redis_consumer_group(self, redis_conn, stream_name, group_name, last_id='$', mkstream=True):
+        """ Create consumer group of Redis stream. Do nothing if group already exists.
+
+        Arguments:
+            - redis_conn: Redis connection object
+            - stream_name: Stream name
+            - group_name: Consumer group name
+            - last_id: Group reads entries after this ID. ``$`` reads only new entries, ``0`` reads all entries.
+              (default=$)
+            - mkstream: Create empty stream if it doesn't exist (default is True)
+
+        Examples:
+        | Create Redis Consumer Group | ${redis_conn} | Events | robot | last_id=0 |
+        """
+        try:
+            redis_conn.xgroup_create(stream_name, group_name, id=last_id, mkstream=mkstream)
+        except redis.ResponseError as ex:
+            if 'BUSYGROUP' not in str(ex):
+                raise
+            logger.info("Consumer group: %s already exists." % group_name)
+
+    @keyword('Read Entries From Redis Consumer Group')
+    def read_entries_from_redis_consumer_group(self, redis_conn, stream_name, group_name, consumer_name, count=100,
+                                               block=None, last_id='>', noack=False):
+        """ Read entries of Redis stream as consumer of consumer group by ``XREADGROUP``.
+            Read entries are pending until they are acknowledged by `Acknowledge Redis Stream Entries`.
+
+        Arguments:
+            - redis_conn: Redis connection object
+            - stream_name: Stream name
+            - group_name: Consumer group name
+            - consumer_name: Consumer name, created on first read
+            - count: Maximum number of entries to return (default=100)
+            - block: Wait for new entries up to this time in Robot Framework time format (default is no waiting)
+            - last_id: ``>`` reads entries never delivered to group, other ID reads pending entries of consumer
+              after the ID (default=>)
+            - noack: Don't add read entries to pending list (default is False)
+
+        Return list of (entry ID, dictionary of fields), empty list if there is no entry
+
+        Examples:
+        | @{entries}= | Read Entries From Redis Consumer Group | ${redis_conn} | Events | robot | worker-1 | count=1000 | block=1s |
+        """
+        if block is not None:
+            block = max(int(timestr_to_secs(block) * 1000), 1)
+        result = redis_conn.xreadgroup(group_name, consumer_name, {stream_name: last_id}, count=int(count),
+                                       block=block, noack=noack)
+        return result[0][1] if result else []
+
+    @keyword('Acknowledge Redis Stream Entries')
+    def acknowledge_redis_stream_entries(self, redis_conn, stream_name, group_name, *entries, chunk_size=1000):
+        """ Acknowledge entries of consumer group by ``XACK``, many IDs per command and one round-trip per chunk.
+
+        Arguments:
+            - redis_conn: Redis connection object
+            - stream_name: Stream name
+            - group_name: Consumer group name
+            - entries: Entry IDs, or entries returned by `Read Entries From Redis Consumer Group`
+            - chunk_size: Number of IDs per ``XACK`` command (default=1000)
+
+        Return number of acknowledged entries
+
+        Examples:
+        | @{entries}= | Read Entries From Redis Consumer Group | ${redis_conn} | Events | robot | worker-1 |
+        | ${acked}= | Acknowledge Redis Stream Entries | ${redis_conn} | Events | robot | @{entries} |
+        """
+        entry_ids = [entry[0] if isinstance(entry, (list, tuple)) else entry for entry in entries]
+        chunk_size = int(chunk_size)
+        pipe = redis_conn.pipeline(transaction=False)
+        for index in range(0, len(entry_ids), chunk_size):
+            pipe.xack(stream_name, group_name, *entry_ids[index:index + chunk_size])
+        return sum(pipe.execute())
+
+    @keyword('Get Pending Entries From Redis Stream')
+    def get_pending_entries_from_redis_stream(self, redis_conn, stream_name, group_name, consumer_name=None,
+                                              count=None, min_id='-', max_id='+'):
+        """ Get entries read by consumer group but not acknowledged yet by ``XPENDING``.
+
+        Arguments:
+            - redis_conn: Redis connection object
+            - stream_name: Stream name
+            - group_name: Consumer group name
+            - consumer_name: Return only entries pending for this consumer
+            - count: Maximum number of pending entries to return
+            - min_id: Smallest entry ID to return (default=-)
+            - max_id: Biggest entry ID to return (default=+)
+
+        Return summary dictionary with ``pending``, ``min``, ``max`` and ``consumers`` when neither count
+        nor consumer_name is given. Otherwise return list of dictionaries with ``message_id``, ``consumer``,
+        ``time_since_delivered`` and ``times_delivered`` (count default is 1000).
+
+        Examples:
+        | ${summary}= | Get Pending Entries From Redis Stream | ${redis_conn} | Events | robot |
+        | Should Be Equal As Integers | ${summary}[pending] | 0 |
+        | @{pending}= | Get Pending Entries From Redis Stream | ${redis_conn} | Events | robot | worker-1 |
+        """
+        if count is None and consumer_name is None:
+            return redis_conn.xpending(stream_name, group_name)
+        return redis_conn.xpending_range(stream_name, group_name, min_id, max_id, int(count or 1000),
+                                         consumername=consumer_name)
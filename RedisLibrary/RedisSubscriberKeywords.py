@@ -0,0 +1,236 @@
+# -*- coding: utf-8 -*-
+import collections
+import fnmatch
+import threading
+import time
+from robot.api import logger
+from robot.api.deco import keyword
+from robot.utils import timestr_to_secs
+from redis.cluster import RedisCluster
+from .RedisUtils import get_keyspace_channel, get_keyspace_db
+__author__ = 'Traitanit Huangsri'
+__email__ = 'traitanit.hua@gmail.com'
+
+
+class RedisSubscriber(object):
+    """Listen to Redis pub/sub messages in background thread and keep the latest ones in bounded buffer.
+
+    Robot Framework ignores logging from other threads, so listener errors are kept in ``errors``
+    until keyword reading messages reports them.
+    """
+
+    def __init__(self, redis_conn, channels=None, patterns=None, buffer_size=1000):
+        self.db = get_keyspace_db(redis_conn)
+        self.received = 0
+        self.dropped = 0
+        self.errors = []
+        self._buffer = collections.deque(maxlen=int(buffer_size))
+        self._condition = threading.Condition()
+        self._stopped = threading.Event()
+        self._pubsub = redis_conn.pubsub(ignore_subscribe_messages=True)
+        if channels:
+            self._pubsub.subscribe(*channels)
+        if patterns:
+            self._pubsub.psubscribe(*patterns)
+        self._thread = threading.Thread(target=self._listen, name='RedisSubscriber')
+        self._thread.daemon = True
+        self._thread.start()
+
+    def _listen(self):
+        while not self._stopped.is_set():
+            try:
+                message = self._pubsub.get_message(timeout=0.1)
+            except Exception as ex:
+                if not self._stopped.is_set():
+                    with self._condition:
+                        self.errors.append("Redis subscriber stopped: %s" % ex)
+                        self._stopped.set()
+                        self._condition.notify_all()
+                return
+            if message is None:
+                continue
+            message = dict((name, value.decode('utf-8', 'replace') if isinstance(value, bytes) else value)
+                           for name, value in message.items())
+            with self._condition:
+                if len(self._buffer) == self._buffer.maxlen:
+                    self.dropped += 1
+                self._buffer.append(message)
+                self.received += 1
+                self._condition.notify_all()
+
+    def wait_for(self, matcher, timeout):
+        """Return and remove the first buffered message accepted by matcher. Wait until it arrives or timeout.
+        Return None on timeout."""
+        deadline = time.time() + timeout
+        with self._condition:
+            while True:
+                for message in self._buffer:
+                    if matcher(message):
+                        self._buffer.remove(message)
+                        return message
+                remaining = deadline - time.time()
+                if remaining <= 0 or self._stopped.is_set():
+                    return None
+                self._condition.wait(remaining)
+
+    def stats(self):
+        with self._condition:
+            return {'received': self.received, 'dropped': self.dropped, 'buffered': len(self._buffer)}
+
+    def pop_errors(self):
+        """Return and forget errors of listener thread."""
+        with self._condition:
+            errors, self.errors = self.errors, []
+            return errors
+
+    def stop(self):
+        self._stopped.set()
+        self._thread.join()
+        self._pubsub.close()
+        with self._condition:
+            self._condition.notify_all()
+
+
+class RedisSubscriberKeywords(object):
+
+    _subscribers = None
+
+    @keyword('Start Redis Subscriber')
+    def start_redis_subscriber(self, redis_conn, channels=None, patterns=None, keys=None, buffer_size=1000,
+                               enable_keyspace_events=False):
+        """Start listening to Redis messages in background. Received messages are kept in buffer
+        until `Wait For Redis Message` or `Wait For Key Event` consumes them. When buffer is full,
+        the oldest message is dropped.
+
+        Arguments:
+            - redis_conn: Redis connection object
+            - channels: List of channels to subscribe
+            - patterns: List of channel patterns to subscribe
+            - keys: List of key patterns to listen keyspace events ``__keyspace@<db>__:<key>``.
+              Not supported on Redis cluster, where each node publishes events only of its own keys.
+            - buffer_size: Maximum number of buffered messages (default=1000)
+            - enable_keyspace_events: Enable keyspace notifications on Redis server by
+              ``CONFIG SET notify-keyspace-events KEA`` (default is False)
+
+        Return subscriber object
+
+        Examples:
+        | @{channels}= | Create List | orders |
+        | ${subscriber}= | Start Redis Subscriber | ${redis_conn} | channels=${channels} |
+        | @{keys}= | Create List | BARCODE* |
+        | ${subscriber}= | Start Redis Subscriber | ${redis_conn} | keys=${keys} | enable_keyspace_events=True |
+        """
+        channels, patterns, keys = [self._as_list(items) for items in (channels, patterns, keys)]
+        if keys and isinstance(redis_conn, RedisCluster):
+            message = "Keyspace events can't be subscribed on Redis cluster. Subscribe each node by its connection."
+            logger.error(message)
+            raise AssertionError(message)
+        if enable_keyspace_events:
+            redis_conn.config_set('notify-keyspace-events', 'KEA')
+        patterns += [get_keyspace_channel(redis_conn, key) for key in keys]
+        if not channels and not patterns:
+            logger.error("Channels, patterns or keys must be given.")
+            raise AssertionError
+        subscriber = RedisSubscriber(redis_conn, channels, patterns, buffer_size)
+        if self._subscribers is None:
+            self._subscribers = []
+        self._subscribers.append(subscriber)
+        return subscriber
+
+    @keyword('Wait For Redis Message')
+    def wait_for_redis_message(self, subscriber, channel=None, data=None, timeout='10s'):
+        """Wait until subscriber receives message and return it as dictionary with
+        ``type``, ``pattern``, ``channel`` and ``data``. Keyword fails if no message is received before timeout.
+
+        Arguments:
+            - subscriber: Subscriber object from `Start Redis Subscriber`
+            - channel: Wait only message from channel matched with this pattern may contain wildcard.
+            - data: Wait only message which data is equal to this value
+            - timeout: Maximum time to wait in Robot Framework time format (default=10s)
+
+        Examples:
+        | ${message}= | Wait For Redis Message | ${subscriber} | orders | timeout=5s |
+        | Should Be Equal | ${message}[data] | order-created |
+        """
+        def matcher(message):
+            return (channel is None or fnmatch.fnmatchcase(message['channel'], channel)) and \
+                (data is None or message['data'] == str(data))
+        return self._wait_for_message(subscriber, matcher, timeout,
+                                      "No message from channel: %s received." % (channel or '*'))
+
+    @keyword('Wait For Key Event')
+    def wait_for_key_event(self, subscriber, key, event=None, timeout='10s'):
+        """Wait until subscriber receives keyspace event of key and return event name e.g. set, del, expired.
+        Keyword fails if no event is received before timeout.
+
+        Subscriber must listen to the key by ``keys`` argument of `Start Redis Subscriber`
+        and keyspace notifications must be enabled on Redis server.
+
+        Arguments:
+            - subscriber: Subscriber object from `Start Redis Subscriber`
+            - key: Key name
+            - event: Wait only this event
+            - timeout: Maximum time to wait in Robot Framework time format (default=10s)
+
+        Examples:
+        | Wait For Key Event | ${subscriber} | BARCODE|1234567890 | expired | timeout=5s |
+        """
+        channel = '__keyspace@%s__:%s' % (subscriber.db, key)
+
+        def matcher(message):
+            return message['channel'] == channel and (event is None or message['data'] == event)
+        return self._wait_for_message(subscriber, matcher, timeout,
+                                      "No event %s of key: %s received." % (event or '', key))['data']
+
+    @keyword('Get Redis Subscriber Stats')
+    def get_redis_subscriber_stats(self, subscriber):
+        """Return dictionary of ``received``, ``dropped`` (removed from full buffer) and ``buffered`` messages.
+
+        Examples:
+        | ${stats}= | Get Redis Subscriber Stats | ${subscriber} |
+        | Should Be Equal As Integers | ${stats}[dropped] | 0 |
+        """
+        return subscriber.stats()
+
+    @keyword('Stop Redis Subscriber')
+    def stop_redis_subscriber(self, subscriber):
+        """Stop listening and unsubscribe.
+
+        Examples:
+        | Stop Redis Subscriber | ${subscriber} |
+        """
+        subscriber.stop()
+        if self._subscribers and subscriber in self._subscribers:
+            self._subscribers.remove(subscriber)
+
+    @keyword('Stop All Redis Subscribers')
+    def stop_all_redis_subscribers(self):
+        """Stop all subscribers started by `Start Redis Subscriber`.
+
+        Examples:
+        | Stop All Redis Subscribers |
+        """
+        for subscriber in list(self._subscribers or []):
+            self.stop_redis_subscriber(subscriber)
+
+    @staticmethod
+    def _wait_for_message(subscriber, matcher, timeout, error_message):
+        message = subscriber.wait_for(matcher, timestr_to_secs(timeout))
+        errors = subscriber.pop_errors()
+        for error in errors:
+            logger.warn(error)
+        if message is None:
+            error_message = " ".join([error_message] + errors)
+            logger.error(error_message)
+            raise AssertionError(error_message)
+        return message
+
+    @staticmethod
+    def _as_list(items):
+        if not items:
+            return []
+        return [items] if isinstance(items, str) else list(items)
+
+    def _close(self):
+        """Stop subscribers when library is closed. Called by Robot Framework as library listener."""
+        self.stop_all_redis_subscribers()
@@ -0,0 +1,39 @@
+# -*- coding: utf-8 -*-
+import redis
+from redis.cluster import RedisCluster
+__author__ = 'Traitanit Huangsri'
+__email__ = 'traitanit.hua@gmail.com'
+
+
+def percentile(sorted_values, percent):
+    """Nearest-rank percentile of sorted values."""
+    rank = max(int(-(-len(sorted_values) * percent // 100)), 1)
+    return sorted_values[rank - 1]
+
+
+# Event classes included in 'A' flag of notify-keyspace-events
+ALL_KEYSPACE_EVENT_CLASSES = 'g$lshzxet'
+
+
+def get_keyspace_db(redis_conn):
+    """Return db number used in keyspace notification channels of connection. Redis cluster has only db 0."""
+    if isinstance(redis_conn, RedisCluster):
+        return 0
+    return redis_conn.connection_pool.connection_kwargs.get('db', 0)
+
+
+def get_keyspace_channel(redis_conn, key):
+    """Return keyspace notification channel (or pattern) of key."""
+    return '__keyspace@%s__:%s' % (get_keyspace_db(redis_conn), key)
+
+
+def get_keyspace_event_classes(redis_conn):
+    """Return set of event classes e.g. ``$``, ``h``, ``g`` published as keyspace notifications by server,
+    or empty set when keyspace notifications are disabled or ``CONFIG GET`` is not allowed."""
+    try:
+        flags = redis_conn.config_get('notify-keyspace-events').get('notify-keyspace-events', '')
+    except redis.ResponseError:
+        return set()
+    if 'K' not in flags:
+        return set()
+    return set(flags.replace('A', ALL_KEYSPACE_EVENT_CLASSES)) - set('KE')
@@ -0,0 +1,186 @@
+# -*- coding: utf-8 -*-
+import time
+from robot.api import logger
+from robot.api.deco import keyword
+from robot.utils import timestr_to_secs
+from redis.cluster import RedisCluster
+from .RedisUtils import get_keyspace_channel, get_keyspace_event_classes
+__author__ = 'Traitanit Huangsri'
+__email__ = 'traitanit.hua@gmail.com'
+
+
+class RedisWaitKeywords(object):
+
+    # Longest interval between checks when keyspace notifications are not received
+    MAX_POLL_INTERVAL = 1.0
+    # Keyspace event classes which report creation of key (string, list, set, hash, sorted set, stream)
+    # and removal of key (generic e.g. DEL, expired, evicted)
+    CREATE_EVENT_CLASSES = '$lshzt'
+    REMOVE_EVENT_CLASSES = 'gxe'
+
+    @keyword('Wait For Item In List Redis')
+    def wait_for_item_in_list_redis(self, redis_conn, list_name, timeout='10s', from_last_index=False):
+        """Wait until list has item, then remove and return it. Redis blocks the command by ``BLPOP``
+        (``BRPOP`` when from_last_index is True), so keyword returns as soon as item is pushed.
+        Keyword fails if no item is pushed before timeout.
+
+            Socket timeout of the connection must be longer than timeout.
+
+        Arguments:
+            - redis_conn: Redis connection object
+            - list_name: List name as key in redis, or list of them to wait on any of them
+            - timeout: Maximum time to wait in Robot Framework time format (default=10s)
+            - from_last_index: Take item from last index instead of first index (default is False)
+
+        Examples:
+        | ${item}= | Wait For Item In List Redis | ${redis_conn} | Result | timeout=30s |
+        """
+        blocking_pop = redis_conn.brpop if from_last_index else redis_conn.blpop
+        result = blocking_pop(list_name, timeout=self._get_blocking_timeout(timeout))
+        self._fail_when_timeout(result, "No item is pushed to list: %s." % (list_name,))
+        return result[1]
+
+    @keyword('Wait And Move Item From List Redis')
+    def wait_and_move_item_from_list_redis(self, redis_conn, source_list_name, destination_list_name,
+                                           timeout='10s', source_index='first', destination_index='last'):
+        """Wait until source list has item, then move it to destination list atomically by ``BLMOVE`` and return it.
+        Keyword fails if no item is pushed before timeout.
+
+        Arguments:
+            - redis_conn: Redis connection object
+            - source_list_name: List name to take item from
+            - destination_list_name: List name to put item to
+            - timeout: Maximum time to wait in Robot Framework time format (default=10s)
+            - source_index: Take item from ``first`` or ``last`` index of source list (default=first)
+            - destination_index: Put item to ``first`` or ``last`` index of destination list (default=last)
+
+        Examples:
+        | ${item}= | Wait And Move Item From List Redis | ${redis_conn} | Queue | Processing |
+        """
+        sides = {'first': 'LEFT', 'last': 'RIGHT'}
+        result = redis_conn.blmove(source_list_name, destination_list_name, self._get_blocking_timeout(timeout),
+                                   src=sides[source_index.lower()], dest=sides[destination_index.lower()])
+        self._fail_when_timeout(result, "No item is pushed to list: %s." % source_list_name)
+        return result
+
+    @keyword('Wait For Item In Sorted Set Redis')
+    def wait_for_item_in_sorted_set_redis(self, redis_conn, sorted_set_name, timeout='10s'):
+        """Wait until sorted set has member, then remove the member with the lowest score by ``BZPOPMIN``
+        and return it with its score. Keyword fails if no member is added before timeout.
+
+        Arguments:
+            - redis_conn: Redis connection object
+            - sorted_set_name: Sorted set name, or list of them to wait on any of them
+            - timeout: Maximum time to wait in Robot Framework time format (default=10s)
+
+        Return (member, score)
+
+        Examples:
+        | ${member} | ${score}= | Wait For Item In Sorted Set Redis | ${redis_conn} | Jobs |
+        """
+        result = redis_conn.bzpopmin(sorted_set_name, timeout=self._get_blocking_timeout(timeout))
+        self._fail_when_timeout(result, "No member is added to sorted set: %s." % (sorted_set_name,))
+        return result[1], result[2]
+
+    @keyword('Wait For Stream Entry')
+    def wait_for_stream_entry(self, redis_conn, stream_name, last_id='$', timeout='10s', count=1):
+        """Wait until stream has entries after last_id by ``XREAD BLOCK`` and return them.
+        Entries are not removed from stream. Keyword fails if no entry is added before timeout.
+
+        Arguments:
+            - redis_conn: Redis connection object
+            - stream_name: Stream name
+            - last_id: Return entries after this ID. ``$`` waits for entries added after keyword is called.
+              (default=$)
+            - timeout: Maximum time to wait in Robot Framework time format (default=10s)
+            - count: Maximum number of entries to return (default=1)
+
+        Return list of (entry ID, dictionary of fields)
+
+        Examples:
+        | @{entries}= | Wait For Stream Entry | ${redis_conn} | Events | timeout=5s |
+        """
+        result = redis_conn.xread({stream_name: last_id}, count=int(count),
+                                  block=max(int(timestr_to_secs(timeout) * 1000), 1))
+        self._fail_when_timeout(result, "No entry is added to stream: %s." % stream_name)
+        return result[0][1]
+
+    @keyword('Wait Until Redis Key Exists')
+    def wait_until_redis_key_exists(self, redis_conn, key, timeout='10s'):
+        """Wait until key exists in Redis. Keyword fails if key doesn't exist before timeout.
+
+        When keyspace notifications of key creation (e.g. ``K$`` for strings or ``KA``) are enabled on
+        Redis server, keyword checks key again as soon as key is changed. Otherwise, and on Redis cluster, key is checked with increasing interval up to 1 second.
+
+        Arguments:
+            - redis_conn: Redis connection object
+            - key: String keyword to find.
+            - timeout: Maximum time to wait in Robot Framework time format (default=10s)
+
+        Examples:
+        | Wait Until Redis Key Exists | ${redis_conn} | BARCODE|1234567890 | timeout=30s |
+        """
+        self._wait_until_key(redis_conn, key, True, timeout)
+
+    @keyword('Wait Until Redis Key Does Not Exist')
+    def wait_until_redis_key_does_not_exist(self, redis_conn, key, timeout='10s'):
+        """Wait until key is deleted or expired in Redis. Keyword fails if key still exists after timeout.
+
+        Key is checked again on keyspace notification as in `Wait Until Redis Key Exists`, when notifications
+        of key removal (e.g. ``Kg`` for DEL, ``Kx`` for expiry or ``KA``) are enabled.
+
+        Arguments:
+            - redis_conn: Redis connection object
+            - key: String keyword to find.
+            - timeout: Maximum time to wait in Robot Framework time format (default=10s)
+
+        Examples:
+        | Wait Until Redis Key Does Not Exist | ${redis_conn} | BARCODE|1234567890 | timeout=1 min |
+        """
+        self._wait_until_key(redis_conn, key, False, timeout)
+
+    def _wait_until_key(self, redis_conn, key, exists, timeout):
+        deadline = time.time() + timestr_to_secs(timeout)
+        pubsub = None
+        # Node of cluster publishes only events of its own keys, so cluster is polled.
+        if not isinstance(redis_conn, RedisCluster) and self._is_keyspace_notification_enabled(redis_conn, exists):
+            # Subscribe before the first check, so change between check and subscribe is not missed.
+            pubsub = redis_conn.pubsub(ignore_subscribe_messages=True)
+            pubsub.subscribe(get_keyspace_channel(redis_conn, key))
+        try:
+            interval = 0.01
+            while bool(redis_conn.exists(key)) != exists:
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    message = "Key: %s %s in Redis." % (key, "doesn't exist" if exists else "still exists")
+                    logger.error(message)
+                    raise AssertionError(message)
+                if pubsub is None:
+                    time.sleep(min(interval, remaining))
+                else:
+                    pubsub.get_message(timeout=min(interval, remaining))
+                interval = min(interval * 2, self.MAX_POLL_INTERVAL)
+        finally:
+            if pubsub is not None:
+                pubsub.close()
+
+    def _is_keyspace_notification_enabled(self, redis_conn, exists):
+        """Return True if server publishes any keyspace event which can make the awaited key state true.
+        Key is still polled, so events of other classes are caught by polling."""
+        classes = self.CREATE_EVENT_CLASSES if exists else self.REMOVE_EVENT_CLASSES
+        return bool(set(classes) & get_keyspace_event_classes(redis_conn))
+
+    @staticmethod
+    def _get_blocking_timeout(timeout):
+        """Convert Robot Framework time to timeout of blocking commands. 0 would block forever."""
+        timeout = timestr_to_secs(timeout)
+        if timeout <= 0:
+            logger.error("Timeout must be greater than 0.")
+            raise AssertionError
+        return int(timeout) if timeout == int(timeout) else timeout
+
+    @staticmethod
+    def _fail_when_timeout(result, message):
+        if not result:
+            logger.error(message)
+            raise AssertionError(message)
@@ -1,12 +1,21 @@
 # -*- coding: utf-8 -*-
+from .RedisAsyncKeywords import RedisAsyncKeywords
+from .RedisKeyTrackingKeywords import RedisKeyTrackingKeywords
+from .RedisLatencyKeywords import RedisLatencyKeywords
 from .RedisLibraryKeywords import RedisLibraryKeywords
+from .RedisMetricsKeywords import RedisMetricsKeywords, instrument_keywords
+from .RedisStreamKeywords import RedisStreamKeywords
+from .RedisSubscriberKeywords import RedisSubscriberKeywords
+from .RedisWaitKeywords import RedisWaitKeywords
 from .version import VERSION
 
 __author__ = 'Traitanit Huangsri'
 __email__ = 'traitanit.hua@gmail.com'
 
 
-class RedisLibrary(RedisLibraryKeywords):
+@instrument_keywords
+class RedisLibrary(RedisLibraryKeywords, RedisStreamKeywords, RedisMetricsKeywords, RedisSubscriberKeywords,
+                   RedisWaitKeywords, RedisAsyncKeywords, RedisLatencyKeywords, RedisKeyTrackingKeywords):
     """
     `RedisLibrary` is a [http://www.robotframework.org|Robot Framework] test library which provides keywords for manipulating in-memory data stores in [https://redis.io/|Redis]
 
@@ -37,6 +46,23 @@ class RedisLibrary(RedisLibraryKeywords):
         | | Redis Key Should Not Be Exist | ${redis_conn} | ${redis_key} |
         | | @{key_list}= | Get All Match Keys | ${redis_conn} | BARCODE* | 1000 |
 
+    *Redis Metrics*
+
+    Import library with ``metrics=True`` (or use `Enable Redis Metrics`) to record Redis command count,
+    round-trips, bytes and latency percentiles of every keyword. Summary is logged at the end of the
+    top level suite and written to ``metrics_file`` as JSON.
+
+        | ***** Settings ***** |
+        | Library | RedisLibrary | metrics=True | metrics_file=${OUTPUT_DIR}/redis_metrics.json |
+
+    *Test Data Cleanup*
+
+    Use `Enable Redis Key Tracking` to record keys written by library keywords and delete them
+    at the end of the test or suite which wrote them, without ``FLUSHALL`` or pattern scans.
+
+        | ***** Settings ***** |
+        | Suite Setup | Enable Redis Key Tracking | scope=test |
+
     References:
 
      + Redis-Py Documentation - https://redis-py.readthedocs.io/en/latest/
@@ -44,3 +70,27 @@ class RedisLibrary(RedisLibraryKeywords):
     ROBOT_LIBRARY_SCOPE = "GLOBAL"
     ROBOT_LIBRARY_DOC_FORMAT = "ROBOT"
     ROBOT_LIBRARY_VERSION = VERSION
+
+    def __init__(self, metrics=False, metrics_file=None):
+        RedisLibraryKeywords.__init__(self)
+        RedisAsyncKeywords.__init__(self, self._connections)
+        self.ROBOT_LIBRARY_LISTENER = self
+        if metrics:
+            self.enable_redis_metrics(metrics_file)
+
+    # Library listener methods of mixins are chained here, as only one method of each name is called.
+    def _start_suite(self, name, attrs):
+        self._start_key_tracking_scope('suite')
+
+    def _end_suite(self, name, attrs):
+        self._end_key_tracking_scope('suite')
+        RedisMetricsKeywords._end_suite(self, name, attrs)
+
+    def _start_test(self, name, attrs):
+        RedisLatencyKeywords._start_test(self, name, attrs)
+        self._start_key_tracking_scope('test')
+
+    def _end_test(self, name, attrs):
+        # Latency is captured before cleanup, so UNLINK commands are not reported as commands of test.
+        RedisLatencyKeywords._end_test(self, name, attrs)
+        self._end_key_tracking_scope('test')
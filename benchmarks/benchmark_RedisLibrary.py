@@ -0,0 +1,286 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Benchmark RedisLibrary keywords by keyword family and data size.
+
+Run against ``fakeredis`` (default), an existing server (``--redis-url``) or a ``redis-server``
+spawned on a free local port (``--redis-server``). Each case reports elements per second and
+Python memory peak. Results can be saved as baseline and compared on the next run.
+
+Baseline depends on the machine and the Redis server, so it is not committed. Create it with
+``make bench-baseline`` on the machine which compares results, before changing code, then run ``make bench``.
+
+    python benchmarks/benchmark_RedisLibrary.py --sizes 1000 100000 --output bench.json
+    python benchmarks/benchmark_RedisLibrary.py --baseline benchmarks/baseline.json --save-baseline
+    python benchmarks/benchmark_RedisLibrary.py --baseline benchmarks/baseline.json --tolerance 0.2
+"""
+import argparse
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+import tracemalloc
+from os.path import abspath, dirname
+
+sys.path.insert(0, dirname(dirname(abspath(__file__))))
+from RedisLibrary import RedisLibrary  # noqa: E402
+
+__author__ = 'Traitanit Huangsri'
+__email__ = 'traitanit.hua@gmail.com'
+
+# Keywords which send one command per element run at most this number of elements,
+# so big sizes measure the bulk keywords without taking hours.
+PER_KEY_LIMIT = 10000
+
+
+class Measurement(object):
+    """Start time of measured part of case. Starting resets Python memory peak."""
+
+    started = None
+
+    def start(self):
+        tracemalloc.reset_peak()
+        self.started = time.time()
+
+
+def strings_set_to_redis(lib, conn, size, measure):
+    count = min(size, PER_KEY_LIMIT)
+    for i in range(count):
+        lib.set_to_redis(conn, 'bench:string:%d' % i, i)
+    return count
+
+
+def strings_get_from_redis(lib, conn, size, measure):
+    count = min(size, PER_KEY_LIMIT)
+    lib.set_batch_to_redis(conn, (('bench:string:%d' % i, i) for i in range(count)))
+    measure.start()
+    for i in range(count):
+        lib.get_from_redis(conn, 'bench:string:%d' % i)
+    return count
+
+
+def batch_set_batch_to_redis(lib, conn, size, measure):
+    lib.set_batch_to_redis(conn, (('bench:batch:%d' % i, i) for i in range(size)))
+    return size
+
+
+def batch_redis_keys_should_be_exist(lib, conn, size, measure):
+    keys = ['bench:batch:%d' % i for i in range(size)]
+    lib.set_batch_to_redis(conn, ((key, 1) for key in keys))
+    measure.start()
+    lib.redis_keys_should_be_exist(conn, *keys)
+    return size
+
+
+def hashes_add_hash_map_to_redis(lib, conn, size, measure):
+    hash_map = dict(('field_%d' % i, i) for i in range(size))
+    measure.start()
+    lib.add_hash_map_to_redis(conn, 'bench:hash', hash_map)
+    return size
+
+
+def hashes_set_batch_to_redis_hash(lib, conn, size, measure):
+    lib.set_batch_to_redis_hash(conn, (('bench:hash', 'field_%d' % i, i) for i in range(size)))
+    return size
+
+
+def hashes_get_dict_from_redis_hash(lib, conn, size, measure):
+    lib.set_batch_to_redis_hash(conn, (('bench:hash', 'field_%d' % i, i) for i in range(size)))
+    measure.start()
+    lib.get_dict_from_redis_hash(conn, 'bench:hash')
+    return size
+
+
+def hashes_scan_dict_from_redis_hash(lib, conn, size, measure):
+    lib.set_batch_to_redis_hash(conn, (('bench:hash', 'field_%d' % i, i) for i in range(size)))
+    measure.start()
+    lib.scan_dict_from_redis_hash(conn, 'bench:hash')
+    return size
+
+
+def sets_add_set_data_to_redis_set(lib, conn, size, measure):
+    lib.add_set_data_to_redis_set(conn, 'bench:set', *range(size))
+    return size
+
+
+def sets_get_set_from_redis_set(lib, conn, size, measure):
+    lib.add_set_data_to_redis_set(conn, 'bench:set', *range(size))
+    measure.start()
+    lib.get_set_from_redis_set(conn, 'bench:set')
+    return size
+
+
+def sets_scan_set_from_redis_set(lib, conn, size, measure):
+    lib.add_set_data_to_redis_set(conn, 'bench:set', *range(size))
+    measure.start()
+    lib.scan_set_from_redis_set(conn, 'bench:set')
+    return size
+
+
+def sets_items_should_exist_in_redis_set(lib, conn, size, measure):
+    lib.add_set_data_to_redis_set(conn, 'bench:set', *range(size))
+    measure.start()
+    lib.items_should_exist_in_redis_set(conn, 'bench:set', *range(size))
+    return size
+
+
+def lists_push_item_to_last_index_in_list_redis(lib, conn, size, measure):
+    lib.push_item_to_last_index_in_list_redis(conn, 'bench:list', *range(size))
+    return size
+
+
+def lists_get_all_item_from_list_redis(lib, conn, size, measure):
+    lib.push_item_to_last_index_in_list_redis(conn, 'bench:list', *range(size))
+    measure.start()
+    lib.get_all_item_from_list_redis(conn, 'bench:list')
+    return size
+
+
+def lists_get_index_of_item_from_list_redis(lib, conn, size, measure):
+    lib.push_item_to_last_index_in_list_redis(conn, 'bench:list', *range(size))
+    measure.start()
+    lib.get_index_of_item_from_list_redis(conn, 'bench:list', str(size - 1))
+    return size
+
+
+def scan_get_all_match_keys(lib, conn, size, measure):
+    lib.set_batch_to_redis(conn, (('bench:scan:%d' % i, i) for i in range(size)))
+    measure.start()
+    lib.get_all_match_keys(conn, 'bench:scan:*', 0)
+    return size
+
+
+def scan_delete_keys_matching_pattern(lib, conn, size, measure):
+    lib.set_batch_to_redis(conn, (('bench:scan:%d' % i, i) for i in range(size)))
+    measure.start()
+    lib.delete_keys_matching_pattern(conn, 'bench:scan:*')
+    return size
+
+
+def streams_add_entries_to_redis_stream(lib, conn, size, measure):
+    lib.add_entries_to_redis_stream(conn, 'bench:stream', ({'field': i} for i in range(size)))
+    return size
+
+
+def streams_get_entries_from_redis_stream(lib, conn, size, measure):
+    lib.add_entries_to_redis_stream(conn, 'bench:stream', ({'field': i} for i in range(size)))
+    measure.start()
+    lib.get_entries_from_redis_stream(conn, 'bench:stream')
+    return size
+
+
+CASES = [(name.split('_', 1)[0], name.split('_', 1)[1], case) for name, case in sorted(globals().items())
+         if name.split('_', 1)[0] in ('strings', 'batch', 'hashes', 'sets', 'lists', 'scan', 'streams') and callable(case)]
+
+
+def run_case(lib, conn, case, size):
+    """Run case once on empty database. Return elements per second and Python memory peak in bytes.
+    Case returns number of elements. Case which seeds data calls ``measure.start()`` after seeding,
+    so neither time nor memory peak of seeding is measured."""
+    conn.flushall()
+    measure = Measurement()
+    tracemalloc.start()
+    try:
+        measure.start()
+        elements = case(lib, conn, size, measure)
+        seconds = time.time() - measure.started
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return elements / seconds if seconds else float('inf'), peak
+
+
+def run_benchmark(conn, sizes, families=None):
+    lib = RedisLibrary()
+    results = {}
+    for family, name, case in CASES:
+        if families and family not in families:
+            continue
+        for size in sizes:
+            ops, peak = run_case(lib, conn, case, size)
+            results['%s/%s/%d' % (family, name, size)] = {'ops_per_sec': ops, 'memory_peak': peak}
+            print('%-55s %14.1f ops/s %12d bytes' % ('%s/%s/%d' % (family, name, size), ops, peak))
+    conn.flushall()
+    return results
+
+
+def compare_with_baseline(results, baseline, tolerance):
+    """Print cases slower than baseline by more than tolerance and return them."""
+    regressions = []
+    for case, result in sorted(results.items()):
+        if case not in baseline:
+            continue
+        ratio = result['ops_per_sec'] / baseline[case]['ops_per_sec']
+        if ratio < 1 - tolerance:
+            regressions.append(case)
+            print('REGRESSION %-44s %6.1f%% of baseline' % (case, ratio * 100))
+    return regressions
+
+
+def spawn_redis_server(redis_server):
+    sock = socket.socket()
+    sock.bind(('127.0.0.1', 0))
+    port = sock.getsockname()[1]
+    sock.close()
+    process = subprocess.Popen([redis_server, '--port', str(port), '--save', '', '--appendonly', 'no'],
+                               stdout=subprocess.DEVNULL)
+    return process, 'redis://127.0.0.1:%d' % port
+
+
+def get_connection(redis_url=None):
+    if redis_url is None:
+        import fakeredis
+        return fakeredis.FakeStrictRedis()
+    import redis
+    conn = redis.from_url(redis_url)
+    for _ in range(50):
+        try:
+            conn.ping()
+            return conn
+        except redis.ConnectionError:
+            time.sleep(0.1)
+    return conn
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 100000, 1000000])
+    parser.add_argument('--families', nargs='+', choices=sorted(set(case[0] for case in CASES)))
+    parser.add_argument('--redis-url', help='Benchmark existing Redis server. Its data is flushed!')
+    parser.add_argument('--redis-server', help='Path of redis-server to spawn on free local port')
+    parser.add_argument('--output', help='Write results to JSON file')
+    parser.add_argument('--baseline', help='Baseline JSON file to compare results with')
+    parser.add_argument('--save-baseline', action='store_true', help='Write results to baseline file')
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help='Allowed slowdown from baseline before failing (default=0.2)')
+    args = parser.parse_args(argv)
+
+    process = None
+    redis_url = args.redis_url
+    if args.redis_server:
+        process, redis_url = spawn_redis_server(args.redis_server)
+    try:
+        results = run_benchmark(get_connection(redis_url), args.sizes, args.families)
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait()
+
+    if args.output:
+        with open(args.output, 'w') as output_file:
+            json.dump(results, output_file, indent=2, sort_keys=True)
+    if args.baseline and args.save_baseline:
+        with open(args.baseline, 'w') as baseline_file:
+            json.dump(results, baseline_file, indent=2, sort_keys=True)
+    elif args.baseline and os.path.exists(args.baseline):
+        with open(args.baseline) as baseline_file:
+            if compare_with_baseline(results, json.load(baseline_file), args.tolerance):
+                return 1
+    elif args.baseline:
+        print('Baseline %s does not exist. Create it with --save-baseline (make bench-baseline).' % args.baseline)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -12,15 +12,20 @@ with open(version_file) as file:
 
 requirements = [
     'robotframework>=3.0',
-    'redis>=2.10.5'
+    'redis>=4.2.0'
 ]
 
 test_requirements = [
     'tox',
     'coverage',
-    'fakeredis==0.8.2'
+    'fakeredis[lua]>=2.0'
 ]
 
+extra_requirements = {
+    'msgpack': ['msgpack'],
+    'lz4': ['lz4']
+}
+
 CLASSIFIERS = """
 Development Status :: 5 - Production/Stable
 License :: Public Domain
@@ -48,6 +53,7 @@ setup(
                  'RedisLibrary'},
     include_package_data=True,
     install_requires=requirements,
+    extras_require=extra_requirements,
     zip_safe=False,
     keywords='robotframework redislibrary redis',
     classifiers=CLASSIFIERS.splitlines(),